@@ -0,0 +1,117 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import engines
+from anonymizer import anonymized_text_stream,anonymized_text_windowed,read_text
+from csv_anonymizer import anonymized_csv_stream
+import model_registry
+from model_registry import load_models
+from parallel import parallel_iter,worker_count
+
+
+#command line version of the "Anonymize txt File" and "Anonymize CSV File" pages, for batch jobs
+#for eg: python anonymize_cli.py notes/ "exports/*.csv" --package spacy flair --union-intersection union --details 1 3 5
+#each output is written next to its input with the same name as the download of the pages (eg notes_anonymized_.txt)
+
+file_types=['.txt','.csv']
+
+
+#name of the output file, the same as the download name given by the pages
+def output_name(path):
+    root,extension=os.path.splitext(path)
+    return root+"_anonymized_"+extension
+
+
+#txt and csv files given directly, found in the given directories or matched by the given globs
+#outputs of earlier runs are skipped
+def find_files(inputs):
+    found=[]
+    for i in inputs:
+        if os.path.isdir(i):
+            matches=[os.path.join(root,name) for root,_,names in os.walk(i) for name in names]
+        elif os.path.isfile(i):
+            matches=[i]
+        else:
+            matches=glob.glob(i,recursive=True)
+        for path in sorted(matches):
+            root,extension=os.path.splitext(path)
+            if extension.lower() in file_types and not root.endswith("_anonymized_") and path not in found:
+                found.append(path)
+    return found
+
+
+#anonymize one file and write the output next to it, returns [input path, output path, size in bytes, seconds taken]
+def anonymize_file(path,package,union_intersection,additional_details,additional_expression,chunksize,window_size=0,propagate_names=False):
+    start=time.perf_counter()
+    output_path=output_name(path)
+    if path.lower().endswith('.csv'):
+        anonymized_csv_stream(path,chunksize,package,union_intersection,additional_details,additional_expression,output_path=output_path,propagate_names=propagate_names)
+    elif window_size>0:
+        with open(path,'rb') as input_file:
+            user_input=read_text(input_file)
+        with open(output_path,'w',encoding='utf-8',newline='') as output_file:
+            output_file.write(anonymized_text_windowed(user_input,window_size,1,package,union_intersection,additional_details,additional_expression))
+    else:
+        with open(path,'rb') as input_file:
+            anonymized_text_stream(input_file,package=package,union_intersection=union_intersection,additional_details=additional_details,additional_expression=additional_expression,output_path=output_path)
+    return [path,output_path,os.path.getsize(path),time.perf_counter()-start]
+
+
+def parse_args(argv=None):
+    parser=argparse.ArgumentParser(description="Anonymize txt and csv files without the Streamlit app. Outputs are written next to the inputs.")
+    parser.add_argument('inputs',nargs='+',help="txt/csv files, directories or glob patterns")
+    parser.add_argument('--package',nargs='+',required=True,choices=['nltk','spacy','flair','stanza','cascade'],help="package(s) used to find names (cascade runs spacy on everything and flair only where a name is possible)")
+    parser.add_argument('--union-intersection',choices=['union','intersection'],default=None,help="how to combine more than one package (default: union)")
+    parser.add_argument('--details',nargs='*',type=int,default=[],choices=range(1,10),metavar='N',
+                        help="other personal details to mask: 1 NRIC, 2 Case Number, 3 Phone Number, 4 ID, 5 Date, 6 Admission Time, 7 Ward Number, 8 Bed Number, 9 Patient Class")
+    parser.add_argument('--expression',nargs=2,action='append',default=[],metavar=('PATTERN','REPLACEMENT'),help="extra regular expression to mask, can be given more than once")
+    parser.add_argument('--workers',type=int,default=1,help="number of files processed at the same time")
+    parser.add_argument('--memory-budget',type=int,default=8192,help="memory budget for the worker processes in MB")
+    parser.add_argument('--chunksize',type=int,default=10000,help="rows per chunk for csv files")
+    parser.add_argument('--profile',choices=model_registry.profiles,default=model_registry.model_profile,help="parts of the spacy and stanza pipelines to load (ner-only is faster and smaller, full loads the default pipelines)")
+    parser.add_argument('--no-prefilter',action='store_true',help="give every text to the packages, even the ones that cannot contain a name")
+    parser.add_argument('--min-length',type=int,default=engines.prefilter_settings['min_length'],help="texts shorter than this are not given to the packages")
+    parser.add_argument('--propagate-names',action='store_true',help="mask the names found in any cell of a csv chunk in every other cell of the chunk too")
+    parser.add_argument('--window-size',type=int,default=0,help="run the packages on windows of at most this many characters of txt files (0 to give them the whole file)")
+    args=parser.parse_args(argv)
+    if len(args.package)>1 and args.union_intersection==None:
+        args.union_intersection='union'
+    return args
+
+
+def main(argv=None):
+    args=parse_args(argv)
+    files=find_files(args.inputs)
+    if len(files)==0:
+        print("No txt or csv files found",file=sys.stderr)
+        return 1
+    additional_details=args.details or None
+    additional_expression=args.expression or None
+    workers=worker_count(args.package,min(args.workers,len(files)),args.memory_budget)
+    #set before the workers are forked so that they use the same pre-filter
+    if args.no_prefilter:
+        engines.prefilter_settings={}
+    else:
+        engines.prefilter_settings=dict(engines.prefilter_settings,min_length=args.min_length)
+
+    #load the models once before the workers are forked so that they share them
+    model_registry.model_profile=args.profile
+    load_models(args.package)
+    start=time.perf_counter()
+    total_size=0
+    items=[[i,args.package,args.union_intersection,additional_details,additional_expression,args.chunksize,args.window_size,args.propagate_names] for i in files]
+    for done,(path,output_path,size,seconds) in enumerate(parallel_iter(anonymize_file,items,workers),1):
+        total_size+=size
+        elapsed=time.perf_counter()-start
+        print("["+str(done)+"/"+str(len(files))+"] "+path+" -> "+output_path+" ("+str(round(seconds,1))+"s, "
+              +str(round(total_size/1024/1024/max(elapsed,1e-9),2))+" MB/s overall)",file=sys.stderr)
+    elapsed=time.perf_counter()-start
+    print("Anonymized "+str(len(files))+" file(s), "+str(round(total_size/1024/1024,2))+" MB in "+str(round(elapsed,1))+"s with "
+          +str(workers)+" worker(s)",file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import codecs
+import mmap
+import tempfile
+from parallel import parallel_iter
+from spans import combine_spans
+from masking import masking_spans,mask_text
+from detectors import compiled_expression
+from engines import detect_names
+from model_registry import load_models
+from windows import windowed_names
+from name_automaton import NameAutomaton
+from profiler import Profiler,stage
+
+
+#to obtain identified names for eg user_input[0:5]
+def name_list(user_input,list1): 
+    final_names=[]
+    for i in list1:
+        final_names.append(user_input[i[0]:i[1]])
+    final_names=sorted(final_names,key=len,reverse=True)
+    return final_names
+
+
+#detected can be given as {package: ranges} when the packages were already run on this text in a batch
+#each stage is recorded in profiler if it is given (see profiler)
+#automaton can be given to mask the names of other texts too (see masking.name_spans)
+def anonymized_text(user_input,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,timings=None,detected=None,profiler=None,automaton=None):
+
+    #run the selected packages (at the same time if there is more than one), each one gives a list of ranges
+    if detected==None:
+        detected={i:v[0] for i,v in detect_names([user_input],package,timings,profiler).items()}
+    accumulated=[detected[i] for i in detected]
+
+    #union/intersection of the ranges given by the relevant packages (ranges that overlap or touch are merged)
+    with stage(profiler,"union/intersection",len(user_input)):
+        combined=combine_spans(accumulated,union_intersection)
+
+    #find every mention of the identified names and the additional details requested,
+    #then rebuild the text once from those offsets
+    to_mask=masking_spans(user_input,combined,additional_details,profiler,automaton)
+    with stage(profiler,"rebuild text",len(user_input)):
+        final_return=mask_text(user_input,to_mask)
+    if additional_expression!=None:
+        for k,i in enumerate(additional_expression,1):
+            with stage(profiler,"expression "+str(k),len(final_return)):
+                final_return = compiled_expression(i[0]).sub(i[1],final_return)
+    return final_return
+
+
+#names found by the packages in one block inside a worker process, the block is masked by the parent (see anonymized_text_blocks)
+#returns [block, {package: ranges}, time per package, [stages, counts] recorded by the profiler]
+def block_names(user_input,package):
+    timings={}
+    profiler=Profiler()
+    detected={i:v[0] for i,v in detect_names([user_input],package,timings,profiler).items()}
+    return [user_input,detected,timings,[profiler.stages,profiler.counts]]
+
+
+#anonymize a very large text by running the packages on windows of at most window_size characters
+#(spread over workers processes), the names found are then masked in the whole text at once
+def anonymized_text_windowed(user_input,window_size=5000,workers=1,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,timings=None,profiler=None):
+    detected=windowed_names(user_input,package,window_size,workers=workers,timings=timings,profiler=profiler)
+    return anonymized_text(user_input,package,union_intersection,additional_details,additional_expression,timings,detected,profiler)
+
+
+#bytes of an uploaded or opened file in pieces of about block_size bytes, memory-mapped when the file is on disk
+def byte_blocks(file_received,block_size=1<<18):
+    try:
+        data=mmap.mmap(file_received.fileno(),0,access=mmap.ACCESS_READ)
+    except (AttributeError,OSError,ValueError):
+        #in memory (for eg a streamlit upload) or empty
+        data=None
+    if data==None:
+        file_received.seek(0)
+        block=file_received.read(block_size)
+        while block:
+            yield block
+            block=file_received.read(block_size)
+        return
+    with data:
+        for start in range(0,len(data),block_size):
+            yield data[start:start+block_size]
+
+
+#text of a file decoded a block at a time, as blocks of whole lines of about block_size bytes
+#(a line longer than block_size is given as one block)
+def text_blocks(file_received,block_size=1<<18,encoding='utf-8'):
+    decoder=codecs.getincrementaldecoder(encoding)()
+    rest=""
+    for block in byte_blocks(file_received,block_size):
+        text=rest+decoder.decode(block)
+        end=text.rfind("\n")+1
+        if end>0:
+            yield text[:end]
+        rest=text[end:]
+    rest+=decoder.decode(b"",final=True)
+    if rest!="":
+        yield rest
+
+
+#whole text of a file, decoded without building it up line by line
+def read_text(file_received,encoding='utf-8'):
+    if hasattr(file_received,'getvalue'):
+        return file_received.getvalue().decode(encoding)
+    return ''.join(text_blocks(file_received,encoding=encoding))
+
+
+#anonymize the text of a file block by block, the packages run on the blocks in workers processes when workers is more than 1
+#the anonymized blocks are yielded in order as soon as they are done, only a few blocks per worker are held at a time
+#the blocks are masked in order with every name found so far, so a name found in one block is also masked in the later
+#blocks where the packages missed it (a block already written out is not masked again for the names of later blocks)
+def anonymized_text_blocks(file_received,block_size=1<<18,workers=1,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,timings=None,profiler=None):
+    if workers>1:
+        #load the models before the workers are forked so that they share them
+        load_models(package)
+    automaton=NameAutomaton()
+    items=([i,package] for i in text_blocks(file_received,block_size))
+    for user_input,detected,block_timings,block_stages in parallel_iter(block_names,items,workers):
+        if timings!=None:
+            for k in block_timings:
+                timings[k]=timings.get(k,0)+block_timings[k]
+        if profiler!=None:
+            profiler.merge(*block_stages)
+        for start,end in combine_spans([detected[i] for i in detected],union_intersection):
+            automaton.add(user_input[start:end])
+        yield anonymized_text(user_input,package,union_intersection,additional_details,additional_expression,timings,detected,profiler,automaton)
+
+
+#anonymize the text of a file block by block and write each block to output_path (a temporary file if not given)
+#as soon as it is done, returns the name of the file written
+def anonymized_text_stream(file_received,block_size=1<<18,workers=1,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,timings=None,output_path=None,profiler=None):
+    if output_path==None:
+        output_file=tempfile.NamedTemporaryFile(mode='w',suffix='.txt',delete=False,encoding='utf-8',newline='')
+    else:
+        output_file=open(output_path,'w',encoding='utf-8',newline='')
+    with output_file:
+        for i in anonymized_text_blocks(file_received,block_size,workers,package,union_intersection,additional_details,additional_expression,timings,profiler):
+            output_file.write(i)
+    return output_file.name
@@ -1,34 +1,14 @@
 import streamlit as st
-import pandas as pd
-from PIL import Image
-from operator import itemgetter
-from itertools import groupby
-import re
-import nltk
-from nltk import word_tokenize,pos_tag
-import spacy
-from flair.data import Sentence
-from flair.models import SequenceTagger
-from flair.tokenization import SpacyTokenizer
-import stanza
-
-@st.cache_resource
-def load_models():
-    nltk.download('punkt')
-    nltk.download('averaged_perceptron_tagger')
-    nltk.download('maxent_ne_chunker')
-    nltk.download('words')
-    spacy_model = spacy.load('en_core_web_sm')
-    flair_model=SequenceTagger.load('ner')
-    stanza.download('en')
-    stanza_model = stanza.Pipeline('en', download_method=None)
-    return [spacy_model,flair_model,stanza_model]
-    
-    
-models=load_models()
-spacy_nlp=models[0]
-tagger=models[1]
-stanza_nlp=models[2]
+import model_registry
+import about
+import evaluation_of_packages
+import visualize_the_process
+import anonymize_manual_input
+import anonymize_txt
+import anonymize_csv
+
+#models are no longer loaded here, each package is imported and loaded the first time a page needs it (see model_registry.py)
+#the pages are imported once per process, so a rerun only runs the main() of the page that is shown
 
 def main():
     st.title("Welcome to my anonymization tool!")
@@ -36,23 +16,27 @@ def main():
     choice=st.sidebar.radio("Section:",menu)
 
     if choice == "About":
-        exec(open("about.py").read())
+        about.main()
 
     elif choice == "Evaluation of Packages":  
-        exec(open("evaluation_of_packages.py").read())
+        evaluation_of_packages.main()
 
     elif choice == "Visualize the Process":
         
-        exec(open("visualize_the_process.py").read())
+        visualize_the_process.main()
 
     elif choice == "Anonymize Manual Input":
-        exec(open("anonymize_manual_input.py").read())
+        anonymize_manual_input.main()
 
     elif choice == "Anonymize txt File":
-        exec(open("anonymize_txt.py").read())
+        anonymize_txt.main()
 
     else:
-        exec(open("anonymize_csv.py").read())
+        anonymize_csv.main()
+
+    #time taken to load each package that has been used so far
+    if len(model_registry.load_times)>0:
+        st.sidebar.caption("Model load time ("+model_registry.model_profile+" profile): "+", ".join(i+" "+str(round(model_registry.load_times[i],1))+"s" for i in model_registry.load_times))
 
 if __name__ == '__main__':
     main()    
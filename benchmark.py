@@ -0,0 +1,271 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import pandas as pd
+import engines
+import model_registry
+from engines import detect_names
+from masking import masking_spans
+from model_registry import get_model,load_times,model_needs
+from profiler import Profiler
+from span_cache import model_version
+from spans import combine_spans
+
+
+#benchmark of the packages on the 1000 Sentence/Output pairs of modified_data.csv, read by the "Evaluation of Packages" page
+#for eg: python benchmark.py --package nltk spacy --output benchmark_results.json
+#run it once per model profile (python benchmark.py --profile full) to compare the ner-only and full pipelines,
+#each profile has its own output file
+#for each package (and the cascade option), and for the union and intersection of all the packages benchmarked, this measures
+#sentences per second, p50/p95/p99 time per sentence, tracemalloc peak and RSS while anonymizing, model load time
+#and load memory, and precision/recall on a sentence level and an overall level
+#for the cascade option it also gives the fraction of sentences sent on to flair and how many of the names flair finds
+#the cascade still finds
+#each scenario runs in a fresh process of its own that only loads the models of that scenario, so the load time, load
+#memory, RSS and throughput of a scenario describe only its packages (the memory figures are the growth of that process
+#over its size before the models were loaded, the tokenizer shared by every package is loaded before that and timed apart)
+#results are written as json with a schema_version so that the page can tell which format it is reading
+
+schema_version=2
+default_outputs={'ner-only':'benchmark_results.json','full':'benchmark_results_full.json'}
+default_output=default_outputs['ner-only']
+scenario_order=['nltk','spacy','flair','stanza','cascade','union','intersection']
+
+
+#ranges of the [Name] tags of the expected output in the original sentence, found by matching the parts of the
+#output around the tags with the sentence, returns None when they do not match
+def expected_spans(sentence,output):
+    parts=output.split("[Name]")
+    pattern="(.+?)".join(re.escape(i) for i in parts)
+    match=re.fullmatch(pattern,sentence,re.S)
+    if match==None:
+        return None
+    return [[match.start(k),match.end(k)] for k in range(1,len(parts))]
+
+
+#ranges masked as [Name] in sentence by package (a list of packages), the same way anonymized_text masks them
+def predicted_spans(sentence,package,union_intersection,profiler=None):
+    detected=detect_names([sentence],package,profiler=profiler)
+    combined=combine_spans([v[0] for v in detected.values()],union_intersection)
+    return [[i[0],i[1]] for i in masking_spans(sentence,combined) if i[3]=="name"]
+
+
+#k-th percentile of sorted values
+def percentile(values,k):
+    if len(values)==0:
+        return None
+    return values[min(len(values)-1,int(round(k/100*(len(values)-1))))]
+
+
+#resident memory of this process now and at its peak, in MB (None where it cannot be read)
+def rss_mb():
+    current=None
+    peak=None
+    try:
+        with open('/proc/self/statm') as statm:
+            current=int(statm.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024/1024
+    except (OSError,ValueError,IndexError):
+        pass
+    try:
+        import resource
+        peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        #kilobytes on linux, bytes on macos
+        peak=peak/1024/1024 if sys.platform=='darwin' else peak/1024
+    except ImportError:
+        pass
+    return current,peak
+
+
+#growth in MB from before to after, None where the RSS cannot be read
+def rss_growth(before,after):
+    if before==None or after==None:
+        return None
+    return round(after-before,1)
+
+
+#load the models needed by the packages of a scenario (other than the shared tokenizer) once, timing it and
+#tracing the memory it allocates, and measuring how much the RSS of the process grows
+def load_package(package):
+    models=[]
+    for i in package:
+        for k in model_needs[i]:
+            if k!='tokenizer' and k not in models:
+                models.append(k)
+    before,_=rss_mb()
+    tracemalloc.start()
+    for i in models:
+        get_model(i)
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    after,_=rss_mb()
+    return {'load_seconds':round(sum(load_times.get(i,0) for i in models),3),'load_peak_mb':round(peak/1024/1024,1),'load_rss_mb':rss_growth(before,after)}
+
+
+#precision and recall on a sentence level (mean over sentences) and an overall level (over all tags)
+#a [Name] tag is correct when it masks exactly the same characters as a tag of the expected output
+def scores(expected,predicted):
+    true_positive=0
+    expected_total=0
+    predicted_total=0
+    sentence_precision=[]
+    sentence_recall=[]
+    for e,p in zip(expected,predicted):
+        correct=len(set(map(tuple,e))&set(map(tuple,p)))
+        true_positive+=correct
+        expected_total+=len(e)
+        predicted_total+=len(p)
+        if len(p)>0:
+            sentence_precision.append(correct/len(p))
+        if len(e)>0:
+            sentence_recall.append(correct/len(e))
+    def mean(values):
+        return round(sum(values)/len(values),3) if len(values)>0 else None
+    return {
+        'precision_sentence':mean(sentence_precision),
+        'precision_overall':round(true_positive/predicted_total,3) if predicted_total>0 else None,
+        'recall_sentence':mean(sentence_recall),
+        'recall_overall':round(true_positive/expected_total,3) if expected_total>0 else None,
+    }
+
+
+#run one scenario over all the sentences: timed without tracing, then the memory is traced over memory_sample sentences
+#(tracemalloc slows every allocation down, so it would distort the times)
+#the RSS figures are given as the growth over base_rss, the RSS of the process before the models were loaded
+#returns [results, ranges predicted in each sentence]
+def run_scenario(sentences,expected,package,union_intersection,memory_sample=100,base_rss=None):
+    latencies=[]
+    predicted=[]
+    profiler=Profiler()
+    start=time.perf_counter()
+    for i in sentences:
+        sentence_start=time.perf_counter()
+        predicted.append(predicted_spans(i,package,union_intersection,profiler))
+        latencies.append(time.perf_counter()-sentence_start)
+    total=time.perf_counter()-start
+    tracemalloc.start()
+    for i in sentences[:memory_sample]:
+        predicted_spans(i,package,union_intersection)
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    current,rss_peak=rss_mb()
+    latencies.sort()
+    result={
+        'sentences':len(sentences),
+        'seconds':round(total,3),
+        'sentences_per_second':round(len(sentences)/total,2) if total>0 else None,
+        'p50_ms':round(percentile(latencies,50)*1000,2),
+        'p95_ms':round(percentile(latencies,95)*1000,2),
+        'p99_ms':round(percentile(latencies,99)*1000,2),
+        'tracemalloc_peak_mb':round(peak/1024/1024,1),
+        'rss_mb':rss_growth(base_rss,current),
+        'rss_peak_mb':rss_growth(base_rss,rss_peak),
+    }
+    result.update(scores(expected,predicted))
+    if profiler.escalated_fraction()!=None:
+        result['escalated_fraction']=round(profiler.escalated_fraction(),3)
+    return [result,predicted]
+
+
+#sentences of data_path whose expected output matches them, with the ranges of their [Name] tags, and the number skipped
+def load_sentences(data_path='modified_data.csv',limit=None):
+    data=pd.read_csv(data_path)
+    if limit!=None:
+        data=data.head(limit)
+    sentences=[]
+    expected=[]
+    for sentence,output in zip(data['Sentence'],data['Output']):
+        spans=expected_spans(sentence,output)
+        if spans!=None:
+            sentences.append(sentence)
+            expected.append(spans)
+    return sentences,expected,len(data)-len(sentences)
+
+
+#one scenario inside its own process (see run_benchmark), returns [results, ranges predicted in each sentence]
+def scenario_process(data_path,limit,package,union_intersection,memory_sample,profile):
+    model_registry.model_profile=profile
+    #every sentence is given to the packages, so the span cache is not used here
+    engines.span_cache=None
+    sentences,expected,_=load_sentences(data_path,limit)
+    if any('tokenizer' in model_needs[i] for i in package):
+        get_model('tokenizer')
+    base_rss,_=rss_mb()
+    load=load_package(package)
+    result,predicted=run_scenario(sentences,expected,package,union_intersection,memory_sample,base_rss)
+    result.update(load)
+    result['tokenizer_load_seconds']=round(load_times.get('tokenizer',0),3)
+    return [result,predicted]
+
+
+def run_benchmark(data_path='modified_data.csv',package=['nltk','spacy','flair','stanza','cascade'],limit=None,memory_sample=100,log=None):
+    sentences,expected,skipped=load_sentences(data_path,limit)
+    results={}
+    package=[i for i in scenario_order if i in package]
+    scenarios=[[i,[i],None] for i in package]
+    #the cascade option only runs packages that are already in the union/intersection
+    combined=[i for i in package if i!='cascade']
+    if len(combined)>1:
+        scenarios+=[['union',combined,'union'],['intersection',combined,'intersection']]
+    predicted={}
+    for name,scenario_package,union_intersection in scenarios:
+        #a fresh interpreter (spawned, not forked from this one) so that no model of another scenario is in memory
+        with ProcessPoolExecutor(max_workers=1,mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[name],predicted[name]=executor.submit(scenario_process,data_path,limit,scenario_package,union_intersection,memory_sample,model_registry.model_profile).result()
+        if log!=None:
+            log(name+": "+json.dumps(results[name]))
+    if 'cascade' in results and 'flair' in results:
+        #share of the names found by flair on every sentence that the cascade still finds
+        results['cascade']['flair_recall']=scores(predicted['flair'],predicted['cascade'])['recall_overall']
+    return {
+        'schema_version':schema_version,
+        'created':datetime.now().isoformat(timespec='seconds'),
+        'machine':{'platform':platform.platform(),'processor':platform.processor() or platform.machine(),'cpu_count':os.cpu_count(),'python':platform.python_version()},
+        'data':{'path':os.path.basename(data_path),'sentences':len(sentences),'skipped':skipped},
+        'versions':{i:model_version(i) for i in package},
+        'model_profile':model_registry.model_profile,
+        'packages':package,
+        'results':results,
+    }
+
+
+#benchmark results written by run_benchmark, or None if there are none or they are in a format this version cannot read
+def load_results(path=default_output):
+    try:
+        with open(path,encoding='utf-8') as results_file:
+            results=json.load(results_file)
+    except (OSError,ValueError):
+        return None
+    if results.get('schema_version')!=schema_version:
+        return None
+    return results
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Benchmark the packages on the Sentence/Output pairs of modified_data.csv")
+    parser.add_argument('--package',nargs='+',default=['nltk','spacy','flair','stanza','cascade'],choices=['nltk','spacy','flair','stanza','cascade'])
+    parser.add_argument('--data',default='modified_data.csv')
+    parser.add_argument('--profile',choices=model_registry.profiles,default=model_registry.model_profile,help="parts of the spacy and stanza pipelines to load")
+    parser.add_argument('--output',default=None,help="default: "+", ".join(i+" for "+default_outputs[i] for i in default_outputs))
+    parser.add_argument('--limit',type=int,default=None,help="only use the first LIMIT sentences")
+    parser.add_argument('--memory-sample',type=int,default=100,help="number of sentences traced with tracemalloc")
+    args=parser.parse_args(argv)
+    model_registry.model_profile=args.profile
+    if args.output==None:
+        args.output=default_outputs[args.profile]
+    results=run_benchmark(args.data,args.package,args.limit,args.memory_sample,log=lambda i:print(i,file=sys.stderr))
+    with open(args.output,'w',encoding='utf-8') as output_file:
+        json.dump(results,output_file,indent=2)
+    print("Results written to "+args.output,file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
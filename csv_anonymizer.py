@@ -0,0 +1,193 @@
+import hashlib
+import pandas as pd
+import tempfile
+from memo_cache import MemoCache
+from parallel import parallel_map,split_rows
+from engines import detect_names,engine_order
+from model_registry import load_models
+from anonymizer import anonymized_text,name_list
+from name_automaton import NameAutomaton
+from profiler import Profiler,stage
+from spans import combine_spans
+
+
+#additional details that can still occur in columns that hold only numbers or only dates
+#(2 needs a letter after the digits and 6 to 9 need words, so they are left out)
+numeric_details=[3,5]
+date_details=[5]
+
+#for eg 2021-03-04, 04/03/2021, 4 Mar 2021, 2021-03-04 10:15:00
+date_pattern=r"(\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\d{1,2}[-\s](?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[-\s]\d{2,4})([\sT]\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?)?"
+numeric_pattern=r"[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?|True|False|true|false"
+
+
+#sniff whether a column can only hold numbers or dates
+#every non-empty value is checked so that a single name in the column still goes through NER
+def column_kind(column):
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(column):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(column) or pd.api.types.is_timedelta64_dtype(column):
+        return "date"
+    values=column.dropna().astype(str).str.strip()
+    values=values[values!=""]
+    if len(values)==0:
+        return "empty"
+    if values.str.fullmatch(numeric_pattern).all():
+        return "numeric"
+    if values.str.fullmatch(date_pattern,case=False).all():
+        return "date"
+    return "text"
+
+
+#resolve the policy of a column into [policy, packages, union/intersection, additional details]
+#policy can be "auto", "full NER" (packages from Step 1), "pass through", "regex only" or a single package name
+def column_plan(column,policy,package,union_intersection,additional_details):
+    if policy=="auto":
+        kind=column_kind(column)
+        if kind=="text":
+            policy="full NER"
+        else:
+            #only the relevant regex detectors are kept for numeric and date-like columns
+            relevant={"numeric":numeric_details,"date":date_details}.get(kind,[])
+            column_details=[i for i in additional_details or [] if i in relevant]
+            return ["regex only",[],None,column_details or None]
+    if policy=="full NER":
+        return ["ner",package,union_intersection,additional_details]
+    if policy in ("pass through","regex only"):
+        return [policy,[],None,additional_details]
+    return ["ner",[policy],None,additional_details]
+
+
+def convert_df(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def anonymized_csv_file(user_input,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,cache=None,column_policies=None,workers=1,timings=None,profiler=None,propagate_names=False):
+    df_anonymized=anonymized_csv_parallel(user_input,workers,package,union_intersection,additional_details,additional_expression,cache,column_policies,timings,profiler,propagate_names)
+    return convert_df(df_anonymized)
+
+
+#anonymize one slice of rows inside a worker process
+#the worker has its own cache, timings and profiler so its hit/miss counts, time per package and stages are sent back with the result
+def anonymized_csv_shard(user_input,package,union_intersection,additional_details,additional_expression,cache_size,column_policies,propagate_names):
+    cache=MemoCache(max_bytes=cache_size)
+    timings={}
+    profiler=Profiler()
+    df_anonymized=anonymized_csv_frame(user_input,package,union_intersection,additional_details,additional_expression,cache,column_policies,timings,profiler,propagate_names)
+    return [df_anonymized,cache.hits,cache.misses,timings,[profiler.stages,profiler.counts]]
+
+
+#shard the rows across worker processes, the rows of the output stay in the same order as the input
+def anonymized_csv_parallel(user_input,workers=1,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,cache=None,column_policies=None,timings=None,profiler=None,propagate_names=False):
+    if cache==None:
+        cache=MemoCache()
+    if workers<=1:
+        return anonymized_csv_frame(user_input,package,union_intersection,additional_details,additional_expression,cache,column_policies,timings,profiler,propagate_names)
+    #load the models before the workers are forked so that they share them
+    load_models(package)
+    shards=split_rows(user_input,workers)
+    results=parallel_map(anonymized_csv_shard,[[i,package,union_intersection,additional_details,additional_expression,cache.max_bytes,column_policies,propagate_names] for i in shards],workers)
+    for i in results:
+        cache.hits+=i[1]
+        cache.misses+=i[2]
+        if timings!=None:
+            for k in i[3]:
+                timings[k]=timings.get(k,0)+i[3][k]
+        if profiler!=None:
+            profiler.merge(*i[4])
+    return pd.concat([i[0] for i in results],ignore_index=True)
+
+
+#anonymize the csv one chunk at a time and append each chunk to output_path (a temporary file if not given)
+#only one chunk of the input and output is held in memory, the path of the output file is returned
+def anonymized_csv_stream(file_received,chunksize=10000,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,cache=None,column_policies=None,workers=1,timings=None,output_path=None,profiler=None,propagate_names=False):
+    #share the cache across chunks so repeated values are still anonymized once per run
+    if cache==None:
+        cache=MemoCache()
+    if output_path==None:
+        output_file=tempfile.NamedTemporaryFile(mode='w',suffix='.csv',delete=False,encoding='utf-8',newline='')
+    else:
+        output_file=open(output_path,'w',encoding='utf-8',newline='')
+    with output_file:
+        first_chunk=True
+        for chunk in pd.read_csv(file_received,chunksize=chunksize):
+            df_anonymized=anonymized_csv_parallel(chunk,workers,package,union_intersection,additional_details,additional_expression,cache,column_policies,timings,profiler,propagate_names)
+            df_anonymized.to_csv(output_file,index=False,header=first_chunk)
+            first_chunk=False
+    return output_file.name
+
+
+#run each package once per batch of cells instead of once per cell
+#returns {package: [spans of cell 0, spans of cell 1, ...]}
+def batched_spans(texts,package,batch_size=1000,timings=None,profiler=None):
+    detected={i:[] for i in engine_order if i in package}
+    for start in range(0,len(texts),batch_size):
+        batch=detect_names(texts[start:start+batch_size],package,timings,profiler)
+        for i in batch:
+            detected[i]+=batch[i]
+    return detected
+
+
+#with propagate_names, a name found in any cell is also masked wherever it is mentioned in the other cells handled by NER
+#(for eg a surname that the packages only recognise in some rows), across the rows anonymized together:
+#the whole file, or each chunk when streaming and each shard when there are several workers
+def anonymized_csv_frame(user_input,package=['stanza'],union_intersection=None,additional_details=None,additional_expression=None,cache=None,column_policies=None,timings=None,profiler=None,propagate_names=False):
+    columns = user_input.columns
+    df_anonymized = pd.DataFrame(columns=columns)
+
+    #identical cells with identical options are only anonymized once per run
+    if cache==None:
+        cache=MemoCache()
+    expression_key=tuple(tuple(i) for i in additional_expression or ())
+
+    #decide how each column is handled before running any package
+    plans=[column_plan(user_input[columns[i]],(column_policies or {}).get(columns[i],"auto"),package,union_intersection,additional_details) for i in range(len(columns))]
+
+    #gather every cell so that each package only needs one batched pass over the file
+    #repeated cell values are only sent to the packages once
+    unique_cells={}
+    for i in range(len(columns)):
+        if plans[i][0]=="ner":
+            group=unique_cells.setdefault(tuple(plans[i][1]),{})
+            for j in user_input[columns[i]]:
+                group.setdefault(str(j),len(group))
+    detected={k:batched_spans(list(unique_cells[k]),list(k),timings=timings,profiler=profiler) for k in unique_cells}
+
+    #one automaton with the names of every cell, the names are part of the cache key since they change the output
+    automaton=None
+    names_key=None
+    if propagate_names:
+        with stage(profiler,"name propagation"):
+            names=set()
+            for i in range(len(columns)):
+                if plans[i][0]=="ner":
+                    group=detected[tuple(plans[i][1])]
+                    positions=unique_cells[tuple(plans[i][1])]
+                    for cell in set(str(j) for j in user_input[columns[i]]):
+                        names.update(name_list(cell,combine_spans([group[k][positions[cell]] for k in group],plans[i][2])))
+            automaton=NameAutomaton(names)
+            automaton.build()
+            names_key=hashlib.sha256("\0".join(sorted(names)).encode('utf-8')).hexdigest()
+
+    #split the spans back out per cell before the union/intersection and masking step
+    for i in range(len(columns)):
+        policy,column_package,column_union_intersection,column_details=plans[i]
+        if policy=="pass through":
+            df_anonymized[columns[i]] = user_input[columns[i]].values
+            continue
+        options=(tuple(column_package),column_union_intersection,tuple(column_details or ()),expression_key,names_key if policy=="ner" else None)
+        text = []
+        for j in user_input[columns[i]]:
+            cell=str(j)
+            key=(cell,)+options
+            output=cache.get(key)
+            if output==None:
+                cell_detected=None
+                if policy=="ner":
+                    group=detected[tuple(column_package)]
+                    cell_detected={k:group[k][unique_cells[tuple(column_package)][cell]] for k in group}
+                output = anonymized_text(user_input=cell,package=column_package,union_intersection=column_union_intersection,additional_details=column_details,additional_expression=additional_expression,timings=timings,detected=cell_detected,profiler=profiler,automaton=automaton if policy=="ner" else None)
+                cache.put(key,output)
+            text.append(output)
+        df_anonymized[columns[i]] = text
+    return df_anonymized
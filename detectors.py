@@ -0,0 +1,47 @@
+import re
+from functools import lru_cache
+from profiler import stage
+
+
+#patterns and replacements for each additional detail (1 to 9)
+#each selected pattern scans the text on its own, detail by detail (the patterns are not fused into one scan, so that
+#overlapping matches are settled by the detail numbers rather than by position)
+#when matches of two details overlap, the one with the smaller number is used
+detail_patterns={
+    1:[[r"([sftg]\d{7}[a-z])",re.IGNORECASE,"[NRIC]"]],
+    2:[[r"(\d{10}[A-z])",re.IGNORECASE,"[CASENO]"]],
+    3:[[r"(\d{8})",0,"[PHONE]"]],
+    4:[[r"([a-z]\d{4}[a-z])",re.IGNORECASE,"[ID]"],[r"(\d{5}[a-z])",re.IGNORECASE,"[ID]"]],
+    5:[[r"(\d{1,2}.\d{1,2}.\d{2,4})",0,"[DATE]"],[r"(\d{1,2}.(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?).\d{2,4})",re.IGNORECASE,"[DATE]"]],
+    6:[[r"(admission Time.\s\d+.\d+)",re.IGNORECASE,"Admission Time: [Time]"]],
+    7:[[r"(ward.\w+\s[a-zA-z0-9]+)",re.IGNORECASE,"Ward:[WardNo]"]],
+    8:[[r"(bed.\s[a-z0-9]+)",re.IGNORECASE,"Bed:[BedNo]"]],
+    9:[[r"(patient class.\s\w+\s[A-Z])",re.IGNORECASE,"Patient Class:[Class]"]],
+}
+
+#every built-in pattern compiled once at import time, as {detail: [[compiled pattern, replacement], ...]}
+detectors={}
+for detail in sorted(detail_patterns):
+    detectors[detail]=[[re.compile(pattern,flags),replacement] for pattern,flags,replacement in detail_patterns[detail]]
+
+
+#matches of the selected additional details as [start char index, end char index, replacement, detail],
+#detail by detail in increasing order (and pattern by pattern within a detail)
+#matches of different details can overlap, the caller keeps the first one that does not overlap an earlier one
+#(see masking.detail_spans) so that the detail with the smaller number wins wherever it matches
+#each detail is recorded as a stage of profiler if it is given
+def detect_details(text,additional_details,profiler=None):
+    output=[]
+    for detail in sorted(set(additional_details)):
+        with stage(profiler,"additional detail "+str(detail),len(text)):
+            for compiled,replacement in detectors.get(detail,[]):
+                for match in compiled.finditer(text):
+                    if match.end()>match.start():
+                        output.append([match.start(),match.end(),replacement,detail])
+    return output
+
+
+#user supplied expressions are compiled once and reused for every cell/line
+@lru_cache(maxsize=256)
+def compiled_expression(pattern):
+    return re.compile(pattern,re.IGNORECASE)
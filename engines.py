@@ -0,0 +1,304 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import get_model
+from span_cache import span_cache
+from tokens import SharedTokens
+
+#nltk, spacy, flair and stanza are only imported when their package is first used (see model_registry)
+#the texts are tokenized once for all the packages (see tokens)
+
+
+#order in which the packages are run and their ranges are accumulated
+#cascade is not a package of its own, see cascade_engine
+engine_order=['nltk','spacy','flair','stanza','cascade']
+
+#fast package run on every text and accurate package run only on the sentences where the fast package or the
+#capitalization of the words suggests a name, by the cascade option
+cascade_packages=['spacy','flair']
+
+#capitalized words that are common in the middle of sentences without being names, they do not send a sentence on
+common_capitalized={'monday','tuesday','wednesday','thursday','friday','saturday','sunday','january','february','march',
+    'april','may','june','july','august','september','october','november','december'}
+#titles after which a capitalized word is a possible name even though the title ends with a full stop
+name_titles={'dr','mr','mrs','ms','mdm','prof','sr','st'}
+
+#texts that cannot contain a name are not given to the packages at all (the regular expressions still run on them)
+#min_length: texts shorter than this (without the surrounding spaces) are skipped
+#alphabetic: texts without any letter are skipped, for eg numbers and dates
+#capitalized: texts without a word of two or more letters starting with a capital are skipped, for eg lower case free text
+#or codes like S1234567A (texts in scripts without capitals, such as Chinese, are never skipped by this)
+prefilter_settings={'min_length':2,'alphabetic':True,'capitalized':True}
+
+#words of letters in any script (for eg Émile, Ömer, O'Brien), capitals are checked with str.isupper so that
+#accented and non-latin capitals count the same as A to Z
+word_pattern=re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+
+
+#whether a word has two or more letters and starts with a capital (Tan, ÁLVARO)
+def capitalized(word):
+    return len(word)>=2 and word[0].isupper()
+
+
+#whether a word is capitalized like a name, a capital followed by a small letter (Émile, but not ICU)
+def title_case(word):
+    return len(word)>=2 and word[0].isupper() and word[1].islower()
+
+
+#append range (start char index,end char index) of a name to the list of a text
+#combine if the words are consecutive (to eliminate problem of identifying first name and last name as two names)
+def add_span(index_list,start,end):
+    if len(index_list)>0 and start==index_list[-1][1]+1:
+        index_list[-1][1]=end
+    else:
+        index_list.append([start,end])
+
+
+#positions of the texts that are not blank
+def non_blank(texts):
+    return [k for k in range(len(texts)) if texts[k].strip()!=""]
+
+
+#person names found by nltk in each text, as a list of ranges per text
+#the sentences of all texts are tagged and chunked together with pos_tag_sents/ne_chunk_sents
+def nltk_spans(tokens):
+    nltk=get_model('nltk')
+    output=[[] for _ in tokens]
+    sentences=[]
+    owners=[]
+    for k in range(len(tokens)):
+        for first,last in tokens[k].sentences:
+            sentences.append(tokens[k].words[first:last])
+            owners.append([k,tokens[k].offsets[first:last]])
+    if len(sentences)==0:
+        return output
+    for (k,offsets),tree in zip(owners,nltk.ne_chunk_sents(nltk.pos_tag_sents(sentences))):
+        position=0
+        for chunk in tree:
+            if hasattr(chunk,'label'):
+                for c in chunk:
+                    if chunk.label()=="PERSON":
+                        add_span(output[k],offsets[position][0],offsets[position][1])
+                    position+=1
+            else:
+                position+=1
+    return output
+
+
+#positions of the texts that have at least one word, the others cannot contain a name so they are not sent to the packages
+def with_words(tokens):
+    return [k for k in range(len(tokens)) if len(tokens[k].words)>0]
+
+
+#person names found by stanza in each text, as a list of ranges per text
+#the pipeline takes the shared words (one sentence per line, words separated by spaces, see model_registry.load_stanza),
+#all texts are processed in one batched call and each entity is visited exactly once
+#the words of an entity are found from their position in their sentence
+def stanza_spans(stanza_nlp,tokens):
+    import stanza
+    output=[[] for _ in tokens]
+    positions=with_words(tokens)
+    if len(positions)==0:
+        return output
+    stanza_docs=stanza_nlp([stanza.Document([],text="\n".join(" ".join(i) for i in tokens[k].sentence_words())) for k in positions])
+    for k,stanza_doc in zip(positions,stanza_docs):
+        for sentence,(first,_) in zip(stanza_doc.sentences,tokens[k].sentences):
+            for entity in sentence.ents:
+                if entity.type=="PERSON":
+                    add_span(output[k],tokens[k].offsets[first+entity.tokens[0].id[0]-1][0],tokens[k].offsets[first+entity.tokens[-1].id[-1]-1][1])
+    return output
+
+
+#person names found by spacy in each text, as a list of ranges per text
+#the pipeline is given Docs built from the shared tokens, so it does not tokenize the texts again
+def spacy_spans(spacy_nlp,tokens):
+    from spacy.tokens import Doc
+    output=[[] for _ in tokens]
+    positions=with_words(tokens)
+    docs=[Doc(spacy_nlp.vocab,words=[i.text for i in tokens[k].doc],spaces=[i.whitespace_!="" for i in tokens[k].doc]) for k in positions]
+    for k,spacy_doc in zip(positions,spacy_nlp.pipe(docs)):
+        for ent in spacy_doc.ents:
+            if ent.label_=="PERSON":
+                add_span(output[k],ent.start_char,ent.end_char)
+    return output
+
+
+#person names found by flair in each text, as a list of ranges per text
+#each text is given to flair as its list of shared words and the sentences are predicted together in mini batches
+#the words of an entity are found from their position in the text
+def flair_spans(tagger,tokens,mini_batch_size=32):
+    from flair.data import Sentence
+    output=[[] for _ in tokens]
+    positions=with_words(tokens)
+    if len(positions)==0:
+        return output
+    sentences=[Sentence(tokens[k].words) for k in positions]
+    tagger.predict(sentences,mini_batch_size=mini_batch_size)
+    for k,text in zip(positions,sentences):
+        for entity in text.get_spans('ner'):
+            if entity.get_label('ner').value=="PER":
+                add_span(output[k],tokens[k].offsets[entity.tokens[0].idx-1][0],tokens[k].offsets[entity.tokens[-1].idx-1][1])
+    return output
+
+
+#run one package over the tokenized texts and time it (the first call also loads the model, which is timed separately)
+def run_engine(name,tokens):
+    model=get_model(name)
+    start=time.perf_counter()
+    if name=='nltk':
+        output=nltk_spans(tokens)
+    elif name=='spacy':
+        output=spacy_spans(model,tokens)
+    elif name=='flair':
+        output=flair_spans(model,tokens)
+    else:
+        output=stanza_spans(model,tokens)
+    return output,time.perf_counter()-start
+
+
+#run one package over the texts of shared at the given positions, taking the ranges of texts it has already seen from
+#the span cache, only the texts not found there are tokenized and given to the package
+#(so a run where every text is found loads no model)
+def cached_engine(name,shared,positions):
+    if span_cache==None:
+        return run_engine(name,shared.get(positions))
+    texts=[shared.texts[k] for k in positions]
+    output=[None]*len(texts)
+    for k,spans in span_cache.get_many(name,texts).items():
+        output[k]=spans
+    missing=[k for k in range(len(texts)) if output[k]==None]
+    seconds=0
+    if len(missing)>0:
+        found,seconds=run_engine(name,shared.get([positions[k] for k in missing]))
+        span_cache.put_many(name,[texts[k] for k in missing],found)
+        for k,spans in zip(missing,found):
+            output[k]=spans
+    return output,seconds
+
+
+#whether text passes the pre-filter, settings are prefilter_settings if not given
+def may_contain_name(text,settings=None):
+    if settings==None:
+        settings=prefilter_settings
+    text=text.strip()
+    if len(text)<max(1,settings.get('min_length',1)):
+        return False
+    if settings.get('alphabetic') and not any(c.isalpha() for c in text):
+        return False
+    if settings.get('capitalized') and not any(capitalized(i) for i in word_pattern.findall(text)) and text.lower()!=text.upper():
+        return False
+    return True
+
+
+#whether text (one sentence) has a capitalized word in the middle of it, not counting days and months, that could be a name
+#the first word of the sentence (or of a clause after a colon, semicolon, quote or bracket) does not count: most
+#sentences start with a capital, and a name there is left to the fast package
+def possible_name(text):
+    for match in word_pattern.finditer(text):
+        if not title_case(match.group()):
+            continue
+        k=match.start()-1
+        while k>=0 and text[k].isspace():
+            k-=1
+        if k<0 or text[k] in '!?:;"\'(':
+            continue
+        if text[k]=='.':
+            #a word after "Dr." and the like is a possible name, after any other full stop it starts a sentence
+            word_start=k
+            while word_start>0 and text[word_start-1].isalpha():
+                word_start-=1
+            if text[word_start:k].lower() not in name_titles:
+                continue
+        if match.group().lower() in common_capitalized:
+            continue
+        return True
+    return False
+
+
+#cascade option: the fast package runs on every text, and only the sentences where it found a name or where possible_name
+#holds are sent to the accurate package, whose ranges are the ones kept (the other sentences have no names)
+#the sentences come from the shared tokens and are given to the accurate package (and its span cache) as texts of their own
+#the number of sentences looked at and sent on are counted in profiler if it is given
+def cascade_engine(shared,profiler=None):
+    texts=shared.texts
+    fast,accurate=cascade_packages
+    fast_output,seconds=cached_engine(fast,shared,range(len(texts)))
+    positions=non_blank(texts)
+    #[position of the text, start char index of the sentence] and the Tokenized of each sentence sent on
+    escalated=[]
+    parts=[]
+    total=0
+    for k,tokens in zip(positions,shared.get(positions)):
+        spans=fast_output[k]
+        position=0
+        for first,last in tokens.sentences:
+            start=tokens.offsets[first][0]
+            end=tokens.offsets[last-1][1]
+            total+=1
+            while position<len(spans) and spans[position][1]<=start:
+                position+=1
+            if (position<len(spans) and spans[position][0]<end) or possible_name(texts[k][start:end]):
+                escalated.append([k,start])
+                parts.append(tokens.part(first,last))
+    output=[[] for _ in texts]
+    if len(escalated)>0:
+        sentences=SharedTokens([texts[k][start:start+part.offsets[-1][1]] for (k,start),part in zip(escalated,parts)])
+        sentences.tokenized=parts
+        found,accurate_seconds=cached_engine(accurate,sentences,range(len(parts)))
+        seconds+=accurate_seconds
+        for (k,start),spans in zip(escalated,found):
+            for s,e in spans:
+                add_span(output[k],s+start,e+start)
+    if profiler!=None:
+        profiler.count("cascade sentences",total)
+        profiler.count("cascade escalated",len(escalated))
+    return output,seconds
+
+
+def engine_runner(name,shared,profiler=None):
+    if name=='cascade':
+        return cascade_engine(shared,profiler)
+    return cached_engine(name,shared,range(len(shared.texts)))
+
+
+#person names found by each selected package in each text, as {package: [ranges of text 0, ranges of text 1, ...]}
+#when more than one package is selected they run at the same time in a thread pool
+#(flair and stanza spend most of their time in torch, which releases the GIL), so a union/intersection
+#takes about as long as the slowest package instead of the sum of all of them
+#the time taken by each package is added to timings if it is given
+#ranges already found for the same text by the same model are taken from the span cache (see span_cache)
+#each package is also recorded as a stage of profiler if it is given
+#texts that do not pass the pre-filter (see may_contain_name) are given no names without running any package,
+#prefilter can be given as settings to use instead of prefilter_settings, or as False to give every text to the packages
+def detect_names(texts,package,timings=None,profiler=None,prefilter=None):
+    chosen=[i for i in engine_order if i in package]
+    if prefilter!=False and len(chosen)>0:
+        kept=[k for k in range(len(texts)) if may_contain_name(texts[k],prefilter)]
+        if profiler!=None:
+            profiler.count("prefilter texts",len(texts))
+            profiler.count("prefilter skipped",len(texts)-len(kept))
+        if len(kept)<len(texts):
+            found=detect_names([texts[k] for k in kept],chosen,timings,profiler,False)
+            output={i:[[] for _ in texts] for i in chosen}
+            for i in chosen:
+                for k,spans in zip(kept,found[i]):
+                    output[i][k]=spans
+            return output
+    #each text is tokenized once, when the first package that needs it gets to it, and shared by all the packages
+    shared=SharedTokens(texts)
+    if len(chosen)>1:
+        with ThreadPoolExecutor(max_workers=len(chosen)) as executor:
+            futures={i:executor.submit(engine_runner,i,shared,profiler) for i in chosen}
+            results={i:futures[i].result() for i in chosen}
+    else:
+        results={i:engine_runner(i,shared,profiler) for i in chosen}
+    if timings!=None:
+        for i in chosen:
+            timings[i]=timings.get(i,0)+results[i][1]
+    if profiler!=None:
+        chars=sum(len(i) for i in texts)
+        for i in chosen:
+            profiler.add("package "+i,results[i][1],chars)
+        if shared.seconds>0:
+            profiler.add("tokenization",shared.seconds,sum(len(texts[k]) for k in range(len(texts)) if shared.tokenized[k]!=None))
+    return {i:results[i][0] for i in chosen}
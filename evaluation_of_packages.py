@@ -1,72 +1,120 @@
 import streamlit as st
 import pandas as pd
 from PIL import Image
+from benchmark import default_outputs,load_results,scenario_order
 
-st.title("Evaluation of Packages")
 
-data_ev=st.container()
-with data_ev:
-    data_ev.header("Data used for Evaluation")
-    data_ev.write("I have done an evaluation of the packages using a modified version of the WikiNeural dataset obtained from [here](https://github.com/Babelscape/wikineural). Only name masking is considered in this section.")
-    citation=data_ev.expander("Citation for WikiNeural Dataset")
-    citation.markdown('''Tedeschi, S., Maiorca, V., Campolungo, N., Cecconi, F., & Navigli, R. (2021). 
+#names of the packages as shown in the tables
+display_names={'nltk':'NLTK','spacy':'spaCy','flair':'flair','stanza':'stanza','cascade':'cascade','union':'union','intersection':'intersection'}
+
+
+def main():
+    st.title("Evaluation of Packages")
+
+    data_ev=st.container()
+    with data_ev:
+        data_ev.header("Data used for Evaluation")
+        data_ev.write("I have done an evaluation of the packages using a modified version of the WikiNeural dataset obtained from [here](https://github.com/Babelscape/wikineural). Only name masking is considered in this section.")
+        citation=data_ev.expander("Citation for WikiNeural Dataset")
+        citation.markdown('''Tedeschi, S., Maiorca, V., Campolungo, N., Cecconi, F., & Navigli, R. (2021). 
     WikiNEuRal: Combined Neural and Knowledge-based Silver Data Creation for Multilingual NER.
     In Findings of the Association for Computational Linguistics: EMNLP 2021 (pp. 2521–2533). 
     Association for Computational Linguistics.
     ''')
-    data=pd.read_csv("modified_data.csv")
-    data_ev.write(data.head())
-    data_ev.caption("Double click on the cell to view the full sentence stored in the cell")
-    data_ev.caption("A total of 1000 sentences was used in this evaluation")
-    data_ev.subheader("Data Visualization")
-    dist_image=Image.open('word_distribution.jpg')
-    data_ev.image(dist_image,caption='The 1000 sentences used for the final evaluation can contain varying number of words, ranging from 3 words to 112 words. Most of the sentences contain around 13 to 23 words',width=600)
-    name_image=Image.open('name_image.jpg')
-    data_ev.image(name_image,caption='Most of the sentences used in the final evaluation contain only 1 personal name(Identified by [Name] in the expected output). There is 1 sentence with 16 personal names.',width=600)
+        data=pd.read_csv("modified_data.csv")
+        data_ev.write(data.head())
+        data_ev.caption("Double click on the cell to view the full sentence stored in the cell")
+        data_ev.caption("A total of 1000 sentences was used in this evaluation")
+        data_ev.subheader("Data Visualization")
+        dist_image=Image.open('word_distribution.jpg')
+        data_ev.image(dist_image,caption='The 1000 sentences used for the final evaluation can contain varying number of words, ranging from 3 words to 112 words. Most of the sentences contain around 13 to 23 words',width=600)
+        name_image=Image.open('name_image.jpg')
+        data_ev.image(name_image,caption='Most of the sentences used in the final evaluation contain only 1 personal name(Identified by [Name] in the expected output). There is 1 sentence with 16 personal names.',width=600)
 
-ev_results=st.container()
-with ev_results:
-    ev_results.header("Evaluation Results")
-    ev_results.subheader("Recall and Precision")
-    ev_results.write("Recall and Precision were calculated for all packages on a sentence level and an overall level.")
-    ev_results.latex(r''' Recall = {True\ Positive \over True Positive + False\ Negative } 
+    ev_results=st.container()
+    with ev_results:
+        ev_results.header("Evaluation Results")
+        ev_results.subheader("Recall and Precision")
+        ev_results.write("Recall and Precision were calculated for all packages on a sentence level and an overall level.")
+        ev_results.latex(r''' Recall = {True\ Positive \over True Positive + False\ Negative } 
               = {Number\ of\ correct\ [Name]\ tag\ by\ package \over Number\ of\ [Name]\ tag\ in\ original\ sentence} ''')
-    ev_results.latex(r'''Precision = {True\ Positive \over True\ Positive + False\ Positive }
+        ev_results.latex(r'''Precision = {True\ Positive \over True\ Positive + False\ Positive }
                  = {Number\ of\ correct\ [Name]\ tag\ by\ package \over Number\ of\ [Name]\ tag\ by\ package} ''')
-    ev_results.latex(r''' Overall\ Recall = {Total\ number\ of\ correct\ [Name]\ tag\ by\ package\ over\ 1000\ sentences \over Total\ number\ of\ [Name]\ tag\ in\ original\ 1000\ sentence} ''')
-    ev_results.latex(r'''Overall\ Precision = {Total\ number\ of\ correct\ [Name]\ tag\ by\ package\ over\ 1000\ sentences \over Total\ number\ of\ [Name]\ tag\ by\ package\ over\ 1000\ sentences}''')
-    package_list=["","NLTK","spaCy","flair","stanza","union","intersection"]
-    values=[["Precision (Sentence Level)","0.838","0.869","0.956","0.902","0.834","0.884"],["Precision (Overall Level)","0.815","0.869","0.944","0.895","0.804","0.888"],
-            ["Recall (Sentence Level)","0.682","0.616","0.852","0.814","0.847","0.520"],["Recall (Overall Level)","0.704","0.639","0.867","0.838","0.870","0.543"]]
-    hide_table_row_index = """
+        ev_results.latex(r''' Overall\ Recall = {Total\ number\ of\ correct\ [Name]\ tag\ by\ package\ over\ 1000\ sentences \over Total\ number\ of\ [Name]\ tag\ in\ original\ 1000\ sentence} ''')
+        ev_results.latex(r'''Overall\ Precision = {Total\ number\ of\ correct\ [Name]\ tag\ by\ package\ over\ 1000\ sentences \over Total\ number\ of\ [Name]\ tag\ by\ package\ over\ 1000\ sentences}''')
+        hide_table_row_index = """
             <style>
             thead tr th:first-child {display:none}
             tbody th {display:none}
             </style>
             """
-    ev_results.markdown(hide_table_row_index, unsafe_allow_html=True)
-    rp=pd.DataFrame(values)
-    rp.columns=package_list
-    ev_results.table(rp)
-    ev_results.subheader("Time Taken and Peak Memory Block")
-    ev_results.write("The time package and tracemalloc package were used to compute the time taken and peak memory block used by in each scenario respectively")
-    with_package,without_package=ev_results.columns(2)
-    header_for_time_memory=["Package Involved","Time Taken (s)","Peak Memory Block (MB)"]
-    with with_package:
-        with_package.subheader("Importing of packages considered")
-        value_results=[["NLTK","52","116"],["spaCy","17","102"],["flair","724","1068"],["stanza","605","253"],["union","1425","1080"],["intersection","1414","1080"]]
-        time_memory=pd.DataFrame(value_results)
-        time_memory.columns=header_for_time_memory
-        with_package.table(time_memory)
-        
-    with without_package:
-        without_package.subheader("Importing of packages not considered")
-        value_results1=[["NLTK","50","72"],["spaCy","12","6"],["flair","711","6"],["stanza","622","6"],["union","1397","82"],["intersection","1391","82"]]
-        time_memory1=pd.DataFrame(value_results1)
-        time_memory1.columns=header_for_time_memory
-        without_package.table(time_memory1)
-        
-    ev_results.caption('''Some observations:
+        ev_results.markdown(hide_table_row_index, unsafe_allow_html=True)
+
+        #results of the last run of benchmark.py on this machine, or the original results if it has not been run
+        benchmark_results=load_results()
+        if benchmark_results!=None:
+            results=benchmark_results['results']
+            scenarios=[i for i in scenario_order if i in results]
+            package_list=[""]+[display_names[i] for i in scenarios]
+            values=[[label]+[results[i][key] for i in scenarios] for label,key in [["Precision (Sentence Level)","precision_sentence"],["Precision (Overall Level)","precision_overall"],
+                    ["Recall (Sentence Level)","recall_sentence"],["Recall (Overall Level)","recall_overall"]]]
+            rp=pd.DataFrame(values)
+            rp.columns=package_list
+            ev_results.table(rp)
+            ev_results.subheader("Time Taken and Memory")
+            ev_results.write("The time package, tracemalloc package and the resident set size (RSS) of the process were used to compute the time taken and memory used in each scenario. Each scenario runs in a fresh process that only loads its own models. The time per sentence includes finding the names and masking them, the tracemalloc peak is taken while anonymizing (after the models are loaded), the RSS is how much the process grew over its size before the models were loaded, and the model load columns cover the importing of packages and loading of models (the tokenizer shared by every package is loaded beforehand and not included)")
+            header_for_time_memory=["Package Involved","Sentences per Second","p50 (ms)","p95 (ms)","p99 (ms)","Time Taken (s)","Peak Memory Block (MB)","RSS (MB)","Model Load Time (s)","Model Load Memory (MB)","Model Load RSS (MB)"]
+            value_results=[[display_names[i]]+[results[i][key] for key in ["sentences_per_second","p50_ms","p95_ms","p99_ms","seconds","tracemalloc_peak_mb","rss_mb","load_seconds","load_peak_mb","load_rss_mb"]] for i in scenarios]
+            time_memory=pd.DataFrame(value_results)
+            time_memory.columns=header_for_time_memory
+            ev_results.table(time_memory)
+            if 'escalated_fraction' in results.get('cascade',{}):
+                cascade=results['cascade']
+                ev_results.caption("The cascade option sent "+str(round(cascade['escalated_fraction']*100,1))+"% of the sentences on to flair"
+                                   +("" if cascade.get('flair_recall')==None else " and still found "+str(round(cascade['flair_recall']*100,1))+"% of the names flair finds when it runs on every sentence"))
+            machine=benchmark_results['machine']
+            ev_results.caption("Results of benchmark.py run on "+benchmark_results['created']+" over "+str(benchmark_results['data']['sentences'])+" sentences, on "+machine['platform']+" ("+str(machine['cpu_count'])+" CPUs, Python "+machine['python']+"), with "+", ".join(benchmark_results['versions'].values())+" and the "+benchmark_results.get('model_profile','full')+" model profile. Run python benchmark.py to update them on this machine.")
+
+            #the same packages loaded with their full pipelines, if benchmark.py --profile full has been run
+            full_results=load_results(default_outputs['full'])
+            if full_results!=None:
+                ev_results.subheader("NER-only and Full Pipelines")
+                ev_results.write("spaCy and stanza can load only the parts of their pipelines needed to find entities (the ner-only profile) or their full pipelines (the full profile). The names found are the same, only the time and memory differ")
+                compared=[i for i in ['spacy','stanza','flair','cascade'] if i in results and i in full_results['results']]
+                header_for_profiles=["Package Involved","Model Load Time (s)","Model Load Memory (MB)","Sentences per Second","Peak Memory Block (MB)"]
+                value_profiles=[]
+                for i in compared:
+                    for profile,profile_results in [["ner-only",results],["full",full_results['results']]]:
+                        value_profiles.append([display_names[i]+" ("+profile+")"]+[profile_results[i][key] for key in ["load_seconds","load_peak_mb","sentences_per_second","tracemalloc_peak_mb"]])
+                profile_table=pd.DataFrame(value_profiles)
+                profile_table.columns=header_for_profiles
+                ev_results.table(profile_table)
+        else:
+            package_list=["","NLTK","spaCy","flair","stanza","union","intersection"]
+            values=[["Precision (Sentence Level)","0.838","0.869","0.956","0.902","0.834","0.884"],["Precision (Overall Level)","0.815","0.869","0.944","0.895","0.804","0.888"],
+                    ["Recall (Sentence Level)","0.682","0.616","0.852","0.814","0.847","0.520"],["Recall (Overall Level)","0.704","0.639","0.867","0.838","0.870","0.543"]]
+            rp=pd.DataFrame(values)
+            rp.columns=package_list
+            ev_results.table(rp)
+            ev_results.subheader("Time Taken and Peak Memory Block")
+            ev_results.write("The time package and tracemalloc package were used to compute the time taken and peak memory block used by in each scenario respectively")
+            with_package,without_package=ev_results.columns(2)
+            header_for_time_memory=["Package Involved","Time Taken (s)","Peak Memory Block (MB)"]
+            with with_package:
+                with_package.subheader("Importing of packages considered")
+                value_results=[["NLTK","52","116"],["spaCy","17","102"],["flair","724","1068"],["stanza","605","253"],["union","1425","1080"],["intersection","1414","1080"]]
+                time_memory=pd.DataFrame(value_results)
+                time_memory.columns=header_for_time_memory
+                with_package.table(time_memory)
+
+            with without_package:
+                without_package.subheader("Importing of packages not considered")
+                value_results1=[["NLTK","50","72"],["spaCy","12","6"],["flair","711","6"],["stanza","622","6"],["union","1397","82"],["intersection","1391","82"]]
+                time_memory1=pd.DataFrame(value_results1)
+                time_memory1.columns=header_for_time_memory
+                without_package.table(time_memory1)
+
+            ev_results.caption('''Some observations:
 - It can be observed that spaCy and NLTK are the faster packages, but at the expense of recall and precision. Although flair and stanza gave a higher recall and precision, they took a much longer time, at least 30 times longer than that of spaCy, and at least 10 times longer than that of NLTK.
 
 - The union and intersection options took a much longer time than the individual packages since they involve all packages. However, the intersection option did not do very well, which is not surprising since it is more restrictive.
@@ -75,6 +123,6 @@ with ev_results:
 
 Note:
 
-- Exact values may vary. Current results are obtained on a MacBook Air M1 Processor and rounded up
+- Exact values may vary. Current results are obtained on a MacBook Air M1 Processor and rounded up. Run python benchmark.py to replace them with results measured on this machine
 
-- A while loop is used under NLTK to obtain the start and end character index of the names identified. For spaCy, flair and stanza, these information could be obtained directly from the entities that the package has labelled.''')
+- Every text is split into words once by the spaCy tokenizer, which records the start and end character index of each word, and all the packages work from those words. The names identified by NLTK, spaCy, flair and stanza are mapped back to those indexes through the words they cover, so no package searches the text for the names it found.''')
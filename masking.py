@@ -0,0 +1,73 @@
+from detectors import detect_details
+from name_automaton import name_automaton
+from profiler import stage
+
+
+#every span to mask is [start char index, end char index (exclusive), replacement, kind]
+#kind is "name" or the number of the additional detail
+#covered marks the characters that are already masked (1 for a name, 2 for an additional detail) so that later spans
+#never overlap earlier ones: names are masked first, then each additional detail where no earlier detail was found
+#a detail that overlaps a name takes the name in, so no part of the detail is left in clear
+
+
+#spans of the identified names in text, built from the sorted and merged ranges detected by the packages (spans)
+#which are masked first as they are, then every other whole word mention of the same names is found in one pass
+#(see name_automaton), longer names first so that the full name is masked before instances where only the first name is used
+#automaton can be given to look for more names than the ones found in this text, for eg the names of every cell of a csv
+def name_spans(text,spans,covered,automaton=None):
+    output=[]
+    for start,end in spans:
+        if end>start and covered.find(1,start,end)==-1:
+            output.append([start,end,"[Name]","name"])
+            covered[start:end]=b"\x01"*(end-start)
+    if automaton==None:
+        automaton=name_automaton(tuple(sorted(set(text[start:end] for start,end in spans))))
+    return output+[[start,end,"[Name]","name"] for start,end in automaton.find(text,covered)]
+
+
+#spans of the additional details requested, skipping the ones that overlap an earlier detail
+#the spans of names (from name_spans) that a detail overlaps are removed and the detail is widened over them,
+#for eg "Ward 5A Tan" is masked as one ward number when "Tan" is a name
+#each detail is recorded as a stage of profiler if it is given (see detectors.detect_details)
+def detail_spans(text,additional_details,covered,names,profiler=None):
+    output=[]
+    for start,end,replacement,detail in detect_details(text,additional_details,profiler):
+        if covered.find(2,start,end)!=-1:
+            continue
+        if covered.find(1,start,end)!=-1:
+            overlapping=[i for i in names if i[0]<end and i[1]>start]
+            for i in overlapping:
+                names.remove(i)
+            start=min([start]+[i[0] for i in overlapping])
+            end=max([end]+[i[1] for i in overlapping])
+        output.append([start,end,replacement,detail])
+        covered[start:end]=b"\x02"*(end-start)
+    return output
+
+
+#all spans to mask for the ranges of the identified names (spans) and the additional details
+#the names and each additional detail are recorded as stages of profiler if it is given
+#(the additional details are masked in the order of their numbers, see detectors.detect_details)
+def masking_spans(text,spans,additional_details=None,profiler=None,automaton=None):
+    covered=bytearray(len(text))
+    with stage(profiler,"name masking",len(text)):
+        output=name_spans(text,spans,covered,automaton)
+    if additional_details!=None:
+        output+=detail_spans(text,additional_details,covered,output,profiler)
+    return sorted(output,key=lambda x:x[0])
+
+
+#rebuild the text in a single left to right pass, replacing each span
+#render can be given to change what each span is replaced with, for eg to color it
+def mask_text(text,spans,render=None):
+    output=[]
+    last=0
+    for i in spans:
+        output.append(text[last:i[0]])
+        if render==None:
+            output.append(i[2])
+        else:
+            output.append(render(i))
+        last=i[1]
+    output.append(text[last:])
+    return ''.join(output)
@@ -0,0 +1,46 @@
+import sys
+from collections import OrderedDict
+
+
+#content-keyed cache with least-recently-used eviction once max_bytes is reached
+class MemoCache:
+
+    def __init__(self,max_bytes=64*1024*1024):
+        self.max_bytes=max_bytes
+        self.current_bytes=0
+        self.hits=0
+        self.misses=0
+        self.entries=OrderedDict()
+
+    #approximate memory taken by one entry (key strings + stored value)
+    def entry_size(self,key,value):
+        size=sys.getsizeof(value)
+        for i in key:
+            size+=sys.getsizeof(i)
+        return size
+
+    def get(self,key):
+        if key in self.entries:
+            self.hits+=1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+        self.misses+=1
+        return None
+
+    def put(self,key,value):
+        size=self.entry_size(key,value)
+        if size>self.max_bytes:
+            return
+        if key in self.entries:
+            self.current_bytes-=self.entries.pop(key)[1]
+        self.entries[key]=(value,size)
+        self.current_bytes+=size
+        #evict least recently used entries until we are back under the cap
+        while self.current_bytes>self.max_bytes:
+            self.current_bytes-=self.entries.popitem(last=False)[1][1]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {'hits':self.hits,'misses':self.misses,'entries':len(self.entries),'bytes':self.current_bytes}
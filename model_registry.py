@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+
+#each package is imported and its model loaded only the first time it is needed, then kept for the whole process
+#local resources are used when they are present so that startup works without network access
+
+#nltk resources needed by the nltk package, as {download name: path looked up by nltk.data.find}
+#(the texts are split into sentences and words by the shared tokenizer, see tokens)
+nltk_resources={
+    'averaged_perceptron_tagger':'taggers/averaged_perceptron_tagger',
+    'maxent_ne_chunker':'chunkers/maxent_ne_chunker',
+    'words':'corpora/words',
+}
+
+#which parts of the spacy and stanza pipelines are loaded, only PERSON entities are ever read from them
+#ner-only: spacy without its tagger, parser, attribute_ruler, lemmatizer and senter, and stanza with only tokenize and ner
+#(stanza always takes the words of the shared tokenizer, see tokens)
+#(the entities found are the same, since the ner components do not use the others)
+#full: the default pipelines, as they were loaded before
+#the profile is chosen for the whole process, with ANONYMIZATION_MODEL_PROFILE (or the --profile option of the scripts)
+profiles=['ner-only','full']
+model_profile=os.environ.get('ANONYMIZATION_MODEL_PROFILE','ner-only')
+spacy_unused=['tagger','parser','attribute_ruler','lemmatizer','senter']
+stanza_processors='tokenize,ner'
+
+#models needed by each option of the pages (every option uses the shared tokenizer, cascade runs spacy and flair)
+model_needs={'nltk':['tokenizer','nltk'],'spacy':['tokenizer','spacy'],'flair':['tokenizer','flair'],'stanza':['tokenizer','stanza'],'cascade':['tokenizer','spacy','flair']}
+
+#loaded models and the time taken to load each of them in seconds
+loaded={}
+load_times={}
+#one lock per package so that two threads never load the same model twice
+locks={i:threading.Lock() for i in ['tokenizer','nltk','spacy','flair','stanza']}
+
+
+#rule-based english tokenizer shared by all the packages (see tokens)
+def load_tokenizer():
+    import spacy
+    return spacy.blank('en')
+
+
+def load_nltk():
+    import nltk
+    for name,path in nltk_resources.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(name,quiet=True)
+    return nltk
+
+
+def load_spacy():
+    import spacy
+    if model_profile=='ner-only':
+        return spacy.load('en_core_web_sm',exclude=spacy_unused)
+    return spacy.load('en_core_web_sm')
+
+
+def load_flair():
+    from flair.models import SequenceTagger
+    return SequenceTagger.load('ner')
+
+
+def load_stanza():
+    import stanza
+    from stanza.resources.common import DEFAULT_MODEL_DIR
+    model_dir=os.environ.get('STANZA_RESOURCES_DIR',DEFAULT_MODEL_DIR)
+    if not (os.path.exists(os.path.join(model_dir,'resources.json')) and os.path.isdir(os.path.join(model_dir,'en'))):
+        stanza.download('en',model_dir=model_dir)
+    if model_profile=='ner-only':
+        return stanza.Pipeline('en',dir=model_dir,processors=stanza_processors,tokenize_pretokenized=True,download_method=None)
+    return stanza.Pipeline('en',dir=model_dir,tokenize_pretokenized=True,download_method=None)
+
+
+loaders={'tokenizer':load_tokenizer,'nltk':load_nltk,'spacy':load_spacy,'flair':load_flair,'stanza':load_stanza}
+
+
+#model of a package, loaded on first use
+def get_model(name):
+    if name in loaded:
+        return loaded[name]
+    with locks[name]:
+        if name not in loaded:
+            start=time.perf_counter()
+            loaded[name]=loaders[name]()
+            load_times[name]=time.perf_counter()-start
+    return loaded[name]
+
+
+#load the models of the selected packages up front, for eg before forking worker processes so they can share them
+def load_models(package):
+    needed=[i for k in package for i in model_needs[k]]
+    for i in ['tokenizer','nltk','spacy','flair','stanza']:
+        if i in needed:
+            get_model(i)
+    return {i:loaded[i] for i in loaded}
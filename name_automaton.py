@@ -0,0 +1,103 @@
+from collections import deque
+from functools import lru_cache
+
+
+#Aho-Corasick automaton over the identified names, so that every mention of every name is found in one left to right
+#pass over a text instead of one str.find loop per name
+#a mention only counts when it is a whole word: a name starting (ending) with a letter or digit cannot be preceded
+#(followed) by one, so "Tan" is not masked inside "Tanjong"
+#the same automaton can be used on many texts, for eg every cell of a csv with the names found in all of them
+
+
+class NameAutomaton:
+
+    def __init__(self,names=()):
+        self.names=set()
+        #goto[state]={character: next state}, ends[state]=lengths of the names ending exactly at state
+        #fail[state]=state to fall back to, output[state]=lengths of the names ending at state or through its fail links
+        self.goto=[{}]
+        self.ends=[[]]
+        self.fail=[0]
+        self.output=[[]]
+        self.built=True
+        for i in names:
+            self.add(i)
+
+    def add(self,name):
+        if name=="" or name in self.names:
+            return
+        self.names.add(name)
+        state=0
+        for c in name:
+            if c not in self.goto[state]:
+                self.goto.append({})
+                self.ends.append([])
+                self.goto[state][c]=len(self.goto)-1
+            state=self.goto[state][c]
+        self.ends[state].append(len(name))
+        self.built=False
+
+    #breadth first pass that sets the fail links and outputs, run once the names have been added
+    def build(self):
+        self.fail=[0]*len(self.goto)
+        self.output=[list(i) for i in self.ends]
+        queue=deque(self.goto[0].values())
+        while len(queue)>0:
+            state=queue.popleft()
+            for c,child in self.goto[state].items():
+                queue.append(child)
+                fallback=self.fail[state]
+                while fallback!=0 and c not in self.goto[fallback]:
+                    fallback=self.fail[fallback]
+                self.fail[child]=self.goto[fallback].get(c,0)
+                self.output[child]+=self.output[self.fail[child]]
+        self.built=True
+
+    #[start char index, end char index] of every whole word mention of a name in text, overlapping ones included
+    def find_all(self,text):
+        if not self.built:
+            self.build()
+        found=[]
+        if len(self.names)==0:
+            return found
+        goto=self.goto
+        fail=self.fail
+        output=self.output
+        state=0
+        for position,c in enumerate(text):
+            while state!=0 and c not in goto[state]:
+                state=fail[state]
+            state=goto[state].get(c,0)
+            for length in output[state]:
+                start=position+1-length
+                if whole_word(text,start,position+1):
+                    found.append([start,position+1])
+        return found
+
+    #mentions of the names in text that do not overlap, longer names first (so the full name is masked before
+    #instances where only the first name is used), then from left to right
+    #covered marks the characters already masked, it is updated with the mentions returned
+    def find(self,text,covered=None):
+        if covered==None:
+            covered=bytearray(len(text))
+        output=[]
+        for start,end in sorted(self.find_all(text),key=lambda x:(x[0]-x[1],x[0])):
+            if covered.find(1,start,end)==-1:
+                output.append([start,end])
+                covered[start:end]=b"\x01"*(end-start)
+        return output
+
+
+#whether text[start:end] is a whole word, see NameAutomaton
+def whole_word(text,start,end):
+    if start>0 and text[start].isalnum() and text[start-1].isalnum():
+        return False
+    if end<len(text) and text[end-1].isalnum() and text[end].isalnum():
+        return False
+    return True
+
+
+#automaton for a set of names, reused when the same names come up again (for eg in many csv cells)
+@lru_cache(maxsize=1024)
+def name_automaton(names):
+    return NameAutomaton(names)
@@ -0,0 +1,74 @@
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+#rough peak memory of each package's model in MB (from the evaluation page)
+model_memory={'nltk':116,'spacy':102,'flair':1068,'stanza':253,'cascade':1170}
+
+#functions run by the workers, registered in the parent before the pool forks
+#so that the workers share the models already loaded in the parent copy-on-write (see model_registry.load_models)
+#instead of loading them again, and get the function (and the data it holds) without pickling it
+#each run has its own id, so runs started at the same time from different threads (for eg two streamlit sessions)
+#never run each other's function
+_tasks={}
+_task_ids=itertools.count()
+
+
+#number of worker processes to use, capped by the cpu count and by how many copies of the models fit in the memory budget
+def worker_count(package,workers=1,memory_budget=8192):
+    per_worker=sum(model_memory.get(i,0) for i in package)
+    if per_worker>0:
+        workers=min(workers,int(memory_budget//per_worker))
+    return max(1,min(workers,os.cpu_count() or 1))
+
+
+def _init_worker():
+    #each worker gets its own core so torch should not start a thread pool per process
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def _run_task(task_id,args):
+    return _tasks[task_id](*args)
+
+
+#run task(*args) for every args in items across a pool of forked workers
+#results are yielded in the same order as items, each one as soon as it and the ones before it are done
+#items can be a generator, only a few items per worker are taken from it ahead of the results being used
+def parallel_iter(task,items,workers=1,ahead=4):
+    if isinstance(items,list):
+        workers=min(workers,len(items))
+    if workers<=1:
+        for i in items:
+            yield task(*i)
+        return
+    task_id=next(_task_ids)
+    _tasks[task_id]=task
+    try:
+        with ProcessPoolExecutor(max_workers=workers,mp_context=multiprocessing.get_context('fork'),initializer=_init_worker) as executor:
+            pending=deque()
+            for i in items:
+                pending.append(executor.submit(_run_task,task_id,i))
+                if len(pending)>=workers*ahead:
+                    yield pending.popleft().result()
+            while len(pending)>0:
+                yield pending.popleft().result()
+    finally:
+        del _tasks[task_id]
+
+
+#same as parallel_iter but returns all the results as a list
+def parallel_map(task,items,workers=1):
+    return list(parallel_iter(task,items,workers))
+
+
+#split a dataframe into at most parts consecutive row slices
+def split_rows(df,parts):
+    size=max(1,-(-len(df)//max(1,parts)))
+    return [df.iloc[i:i+size] for i in range(0,len(df),size)] or [df]
@@ -0,0 +1,112 @@
+import json
+import logging
+import time
+from contextlib import contextmanager,nullcontext
+
+
+#time taken, number of calls and characters processed by each stage of the pipeline
+#(each package, the union/intersection, name masking, each additional detail, rebuilding the text, each custom expression)
+#shown on the pages and written as one json log line per stage, for eg
+#{"event": "stage", "page": "txt", "stage": "package flair", "seconds": 12.3, "calls": 4, "chars": 52000}
+
+logger=logging.getLogger('anonymization_app.profile')
+if len(logger.handlers)==0:
+    handler=logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate=False
+
+
+#header of the rows given by Profiler.table
+table_header=["Stage","Time Taken (s)","Calls","Characters","Characters per Second"]
+
+
+class Profiler:
+
+    def __init__(self):
+        #{stage name: {'seconds':..., 'calls':..., 'chars':...}}, kept as plain dicts so workers can send them back
+        self.stages={}
+        #other numbers counted during the run, for eg the sentences sent on by the cascade option
+        self.counts={}
+
+    def add(self,name,seconds,chars=0,calls=1):
+        stage=self.stages.setdefault(name,{'seconds':0,'calls':0,'chars':0})
+        stage['seconds']+=seconds
+        stage['calls']+=calls
+        stage['chars']+=chars
+
+    def count(self,name,value=1):
+        self.counts[name]=self.counts.get(name,0)+value
+
+    @contextmanager
+    def stage(self,name,chars=0):
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name,time.perf_counter()-start,chars)
+
+    #add the stages (and counts) recorded by another profiler, for eg in a worker process
+    def merge(self,stages,counts=None):
+        for name,stage in stages.items():
+            self.add(name,stage['seconds'],stage['chars'],stage['calls'])
+        for name,value in (counts or {}).items():
+            self.count(name,value)
+
+    #count part as a fraction of count whole, None if nothing was counted in whole
+    def fraction(self,part,whole):
+        if self.counts.get(whole,0)==0:
+            return None
+        return self.counts.get(part,0)/self.counts[whole]
+
+    #fraction of the sentences looked at by the cascade option that were sent to the accurate package
+    def escalated_fraction(self):
+        return self.fraction("cascade escalated","cascade sentences")
+
+    #fraction of the texts that the pre-filter kept from the packages
+    def skipped_fraction(self):
+        return self.fraction("prefilter skipped","prefilter texts")
+
+    #[stage, seconds, calls, characters, characters per second] for each stage, slowest first
+    def table(self):
+        rows=[]
+        for name,stage in sorted(self.stages.items(),key=lambda x:x[1]['seconds'],reverse=True):
+            speed=round(stage['chars']/stage['seconds']) if stage['seconds']>0 else None
+            rows.append([name,round(stage['seconds'],4),stage['calls'],stage['chars'],speed])
+        return rows
+
+    #one json log line per stage, context is added to every line (for eg the page and the packages used)
+    def log(self,**context):
+        for name,stage in self.stages.items():
+            line={'event':'stage'}
+            line.update(context)
+            line.update({'stage':name,'seconds':round(stage['seconds'],6),'calls':stage['calls'],'chars':stage['chars']})
+            logger.info(json.dumps(line))
+        for name,value in self.counts.items():
+            line={'event':'count'}
+            line.update(context)
+            line.update({'count':name,'value':value})
+            logger.info(json.dumps(line))
+
+
+#stage of profiler, or nothing when no profiler is given
+def stage(profiler,name,chars=0):
+    if profiler==None:
+        return nullcontext()
+    return profiler.stage(name,chars)
+
+
+#time taken per package, share of the sentences sent on by the cascade option and kept from the packages by the pre-filter,
+#and the table of the stages, shown at the end of a run on the pages, which also log the stages with context
+#streamlit is only imported here so that the command line tools can use the profiler without it
+def show_profile(profiler,timings,**context):
+    import streamlit as st
+    import pandas as pd
+    st.caption("Time taken per package: "+", ".join(i+" "+str(round(timings[i],2))+"s" for i in timings))
+    if profiler.escalated_fraction()!=None:
+        st.caption("cascade sent "+str(round(profiler.escalated_fraction()*100,1))+"% of the sentences on to flair")
+    if profiler.skipped_fraction()!=None:
+        st.caption("The packages were not run on "+str(round(profiler.skipped_fraction()*100,1))+"% of the texts, which could not contain a name")
+    st.expander("Time taken by each stage").table(pd.DataFrame(profiler.table(),columns=table_header))
+    profiler.log(**context)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import engines
+import model_registry
+from anonymizer import byte_blocks
+from span_cache import model_version
+
+
+#anonymized files kept on disk between reruns of the pages (and shared by every session of the app), so that
+#running the same file with the same options again only serves the earlier output
+#files are named by a hash of the uploaded content and the options, the least recently used ones are removed
+#once the files take more than max_bytes
+
+default_directory=os.path.join(tempfile.gettempdir(),'anonymization_app_results')
+
+
+#hash of the content of an uploaded file together with the options it is anonymized with
+#the model profile, the pre-filter settings and the versions of every package are added to the options, so that
+#the output of an earlier profile or model is not served again after they change
+#the file is read in blocks and left at its start for the code reading it afterwards
+def result_key(file_received,options):
+    digest=hashlib.sha256()
+    for block in byte_blocks(file_received):
+        digest.update(block)
+    pipeline=[model_registry.model_profile,sorted(engines.prefilter_settings.items()),[model_version(i) for i in engines.engine_order]]
+    digest.update(repr([options,pipeline]).encode('utf-8'))
+    file_received.seek(0)
+    return digest.hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self,directory=default_directory,max_bytes=1024*1024*1024):
+        self.directory=directory
+        self.max_bytes=max_bytes
+        self.hits=0
+        self.misses=0
+        os.makedirs(directory,exist_ok=True)
+
+    def path(self,key,suffix):
+        return os.path.join(self.directory,key+suffix)
+
+    #path of the stored output, or None if there is none
+    def get(self,key,suffix):
+        path=self.path(key,suffix)
+        try:
+            #mark the file as recently used
+            os.utime(path)
+        except OSError:
+            self.misses+=1
+            return None
+        self.hits+=1
+        return path
+
+    #move the output file at source_path into the cache, returns its new path
+    def put(self,key,suffix,source_path):
+        path=self.path(key,suffix)
+        #move to a temporary file of its own in the cache directory first so that another session never reads a half
+        #written file, and two sessions (threads of the same process) storing the same key never share a temporary name
+        if os.path.dirname(os.path.abspath(source_path))!=os.path.abspath(self.directory):
+            handle,partial_path=tempfile.mkstemp(suffix='.part',dir=self.directory)
+            os.close(handle)
+            try:
+                shutil.move(source_path,partial_path)
+            except BaseException:
+                os.remove(partial_path)
+                raise
+            source_path=partial_path
+        os.replace(source_path,path)
+        self.evict(keep=path)
+        return path
+
+    #store an output held in memory (str or bytes), returns its path
+    def put_data(self,key,suffix,data):
+        if isinstance(data,str):
+            data=data.encode('utf-8')
+        output_file=tempfile.NamedTemporaryFile(mode='wb',suffix='.part',dir=self.directory,delete=False)
+        with output_file:
+            output_file.write(data)
+        return self.put(key,suffix,output_file.name)
+
+    #remove the least recently used outputs until the rest fit in max_bytes (the one just stored is always kept)
+    def evict(self,keep=None):
+        files=[]
+        for name in os.listdir(self.directory):
+            path=os.path.join(self.directory,name)
+            if name.endswith('.part') or path==keep:
+                continue
+            try:
+                status=os.stat(path)
+            except OSError:
+                continue
+            files.append([status.st_mtime,status.st_size,path])
+        total=sum(i[1] for i in files)
+        if keep!=None and os.path.exists(keep):
+            total+=os.path.getsize(keep)
+        for _,size,path in sorted(files):
+            if total<=self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total-=size
+
+    def stats(self):
+        files=os.listdir(self.directory)
+        return {'hits':self.hits,'misses':self.misses,'entries':len(files),'bytes':sum(os.path.getsize(os.path.join(self.directory,i)) for i in files)}
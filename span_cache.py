@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from importlib import metadata
+
+
+#ranges of PERSON names found by each package in each text, kept on disk in sqlite so that the packages never run
+#twice on the same text with the same model, across reruns, sessions, app processes and worker processes
+#the ranges are stored as each package gives them (before union/intersection and masking), so changing those options
+#or the regular expressions never needs the packages again
+#the least recently used texts are removed once the stored ranges take more than max_bytes
+
+#set ANONYMIZATION_SPAN_CACHE to another file to move the cache, or to an empty string to turn it off
+default_path=os.environ.get('ANONYMIZATION_SPAN_CACHE',os.path.join(os.path.expanduser('~'),'.cache','anonymization_app','spans.sqlite'))
+
+#python packages whose versions decide the output of each package (spacy also gives the words to every package, see tokens)
+version_packages={'nltk':['nltk','spacy'],'spacy':['spacy','en_core_web_sm'],'flair':['flair','spacy'],'stanza':['stanza','spacy'],'cascade':['spacy','en_core_web_sm','flair']}
+model_versions={}
+
+
+#version of the model behind a package, read without importing it so that a text found in the cache needs no model
+def model_version(name):
+    if name not in model_versions:
+        versions=[]
+        for i in version_packages[name]:
+            try:
+                versions.append(i+"=="+metadata.version(i))
+            except metadata.PackageNotFoundError:
+                versions.append(i)
+        model_versions[name]=",".join(versions)
+    return model_versions[name]
+
+
+def text_key(name,text):
+    return hashlib.sha256((name+"\0"+model_version(name)+"\0"+text).encode('utf-8')).hexdigest()
+
+
+class SpanCache:
+
+    def __init__(self,path=default_path,max_bytes=256*1024*1024,evict_every=1000):
+        self.path=path
+        self.max_bytes=max_bytes
+        self.evict_every=evict_every
+        self.hits=0
+        self.misses=0
+        self.puts=0
+        #the packages run in threads, and a forked worker must not use the connection of its parent
+        self.lock=threading.Lock()
+        self.connection=None
+        self.pid=None
+
+    def connect(self):
+        if self.connection==None or self.pid!=os.getpid():
+            directory=os.path.dirname(self.path)
+            if directory!="":
+                os.makedirs(directory,exist_ok=True)
+            self.connection=sqlite3.connect(self.path,timeout=30,check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS spans (key TEXT PRIMARY KEY, spans TEXT, size INTEGER, used REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS spans_used ON spans (used)")
+            self.pid=os.getpid()
+        return self.connection
+
+    #stored ranges of the texts for a package, as {position of the text: ranges} for the texts found
+    def get_many(self,name,texts):
+        keys=[text_key(name,i) for i in texts]
+        found={}
+        try:
+            with self.lock:
+                connection=self.connect()
+                #sqlite allows a limited number of parameters per query
+                for start in range(0,len(keys),500):
+                    batch=keys[start:start+500]
+                    found.update(connection.execute("SELECT key,spans FROM spans WHERE key IN ("+",".join("?"*len(batch))+")",batch).fetchall())
+                if len(found)>0:
+                    with connection:
+                        connection.executemany("UPDATE spans SET used=? WHERE key=?",[[time.time(),i] for i in found])
+        except (sqlite3.Error,OSError):
+            #an unusable cache (for eg a read-only or locked file) only means the packages have to run
+            found={}
+        self.hits+=len(found)
+        self.misses+=len(keys)-len(found)
+        return {k:json.loads(found[keys[k]]) for k in range(len(keys)) if keys[k] in found}
+
+    #store the ranges found by a package, given as lists of texts and of their ranges
+    def put_many(self,name,texts,spans):
+        rows=[]
+        for text,text_spans in zip(texts,spans):
+            value=json.dumps(text_spans,separators=(',',':'))
+            rows.append([text_key(name,text),value,len(value)+64,time.time()])
+        try:
+            with self.lock:
+                connection=self.connect()
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO spans VALUES (?,?,?,?)",rows)
+                self.puts+=len(rows)
+                if self.puts>=self.evict_every:
+                    self.puts=0
+                    self.evict()
+        except (sqlite3.Error,OSError):
+            pass
+
+    #remove the least recently used texts until the rest fit in max_bytes
+    def evict(self):
+        connection=self.connect()
+        total=connection.execute("SELECT COALESCE(SUM(size),0) FROM spans").fetchone()[0]
+        if total<=self.max_bytes:
+            return
+        #remove down to 90% of the cap so that eviction does not run on every put
+        excess=total-int(self.max_bytes*0.9)
+        removed=0
+        keys=[]
+        rows=connection.execute("SELECT key,size FROM spans ORDER BY used")
+        for key,size in rows:
+            keys.append([key])
+            removed+=size
+            if removed>=excess:
+                break
+        rows.close()
+        with connection:
+            connection.executemany("DELETE FROM spans WHERE key=?",keys)
+
+    def stats(self):
+        with self.lock:
+            entries,size=self.connect().execute("SELECT COUNT(*),COALESCE(SUM(size),0) FROM spans").fetchone()
+        return {'hits':self.hits,'misses':self.misses,'entries':entries,'bytes':size}
+
+
+span_cache=SpanCache() if default_path!="" else None
@@ -0,0 +1,60 @@
+#interval algebra on the (start char index, end char index) ranges given by the packages
+#a range [s,e] covers the characters s to e inclusive, so two ranges are merged when they overlap or
+#when one starts right after the other ends (eg [0,4] and [5,9] -> [0,9], which joins a first name and a last name)
+
+
+#sort and merge the ranges of a single list, for eg [[5,9],[0,4],[12,15]] -> [[0,9],[12,15]]
+def merge_spans(list1):
+    output=[]
+    for i in sorted(list1):
+        if len(output)>0 and i[0]<=output[-1][1]+1:
+            output[-1][1]=max(output[-1][1],i[1])
+        else:
+            output.append([i[0],i[1]])
+    return output
+
+
+#union of the ranges given by the relevant packages
+def union_spans(list1):
+    return merge_spans([i for spans in list1 for i in spans])
+
+
+#intersection of two merged lists of ranges
+def intersect_two(list1,list2):
+    output=[]
+    a=0
+    b=0
+    while a<len(list1) and b<len(list2):
+        start=max(list1[a][0],list2[b][0])
+        end=min(list1[a][1],list2[b][1])
+        if start<=end:
+            output.append([start,end])
+        #move on from whichever range ends first
+        if list1[a][1]<list2[b][1]:
+            a+=1
+        else:
+            b+=1
+    return output
+
+
+#intersection of the ranges given by the relevant packages
+def intersect_spans(list1):
+    if len(list1)==0:
+        return []
+    output=merge_spans(list1[0])
+    for i in list1[1:]:
+        output=intersect_two(output,merge_spans(i))
+    #touching ranges from different packages are joined, as with the union
+    return merge_spans(output)
+
+
+#combine the ranges of each package according to union_intersection
+#if only one package is used its ranges are returned as they are
+def combine_spans(accumulated,union_intersection=None):
+    if union_intersection!=None and union_intersection.lower()=='union':
+        return union_spans(accumulated)
+    elif union_intersection!=None and union_intersection.lower()=='intersection':
+        return intersect_spans(accumulated)
+    elif len(accumulated)!=0:
+        return accumulated[0]
+    return []
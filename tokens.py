@@ -0,0 +1,79 @@
+import threading
+import time
+from model_registry import get_model
+
+
+#every text is split into sentences and words once, and all the selected packages work from those words
+#(spacy, flair, stanza and nltk used to tokenize the same text again each, flair through a second spacy pass)
+#the words come from the rule-based spacy tokenizer for english, which needs no trained model
+
+#words after which a new sentence starts
+sentence_ends={'.','!','?','...'}
+#sentences are cut after this many words so that one text without punctuation is not given to stanza/nltk as one sentence
+max_sentence_words=300
+
+
+#words of one text with their (start char index,end char index) and the sentences they form
+#doc: the spacy Doc of the text, including its whitespace tokens
+#words/offsets: the words that are not whitespace and their ranges in the text
+#sentences: [first word, last word + 1] of each sentence
+class Tokenized:
+
+    def __init__(self,doc):
+        self.doc=doc
+        self.words=[]
+        self.offsets=[]
+        self.sentences=[]
+        start=0
+        for token in doc:
+            if token.is_space:
+                #a line break ends the sentence
+                if "\n" in token.text and len(self.words)>start:
+                    self.sentences.append([start,len(self.words)])
+                    start=len(self.words)
+                continue
+            self.words.append(token.text)
+            self.offsets.append([token.idx,token.idx+len(token.text)])
+            if token.text in sentence_ends or len(self.words)-start>=max_sentence_words:
+                self.sentences.append([start,len(self.words)])
+                start=len(self.words)
+        if len(self.words)>start:
+            self.sentences.append([start,len(self.words)])
+
+    #the sentences as lists of words
+    def sentence_words(self):
+        return [self.words[first:last] for first,last in self.sentences]
+
+    #words first to last-1 as a Tokenized of their own (one sentence), with offsets from the start of the first word
+    #it has no doc, so it can be given to nltk, flair and stanza but not to spacy
+    def part(self,first,last):
+        start=self.offsets[first][0]
+        output=Tokenized([])
+        output.doc=None
+        output.words=self.words[first:last]
+        output.offsets=[[s-start,e-start] for s,e in self.offsets[first:last]]
+        output.sentences=[[0,last-first]]
+        return output
+
+
+#the texts given to detect_names, each one tokenized the first time a package needs it
+#the packages run in threads, so a text needed by two of them at the same time is still only tokenized once
+class SharedTokens:
+
+    def __init__(self,texts):
+        self.texts=texts
+        self.tokenized=[None]*len(texts)
+        self.seconds=0
+        self.lock=threading.Lock()
+
+    #Tokenized of the texts at the given positions
+    def get(self,positions):
+        with self.lock:
+            missing=[k for k in positions if self.tokenized[k]==None]
+            if len(missing)>0:
+                start=time.perf_counter()
+                tokenizer=get_model('tokenizer')
+                for k,doc in zip(missing,tokenizer.pipe([self.texts[k] for k in missing])):
+                    self.tokenized[k]=Tokenized(doc)
+                self.seconds+=time.perf_counter()-start
+        return [self.tokenized[k] for k in positions]
@@ -0,0 +1,81 @@
+import re
+from functools import partial
+from engines import detect_names
+from model_registry import load_models
+from parallel import parallel_map
+from profiler import Profiler
+
+
+#very large texts are not given to the packages as one string (one flair Sentence / stanza Document / spacy Doc
+#for the whole file) but as windows of whole paragraphs, lines or sentences of at most window_size characters
+#the ranges found in each window are moved back to the offsets of the whole text, so peak memory depends on
+#the window size and the number of windows per call instead of the size of the file
+
+#places where a window may end: after a blank line, after a line break, after the end of a sentence
+boundaries=[re.compile(r'\n\s*\n'),re.compile(r'\n'),re.compile(r'(?<=[.!?])\s+')]
+
+
+#last place in text[start:end] where a window can end, trying paragraphs first, then lines, then sentences,
+#then the last space, returns None when there is none
+def window_end(text,start,end):
+    for boundary in boundaries:
+        found=None
+        for match in boundary.finditer(text,start,end):
+            found=match.end()
+        if found!=None and found>start:
+            return found
+    found=text.rfind(' ',start,end)
+    if found>start:
+        return found+1
+    return None
+
+
+#split text into consecutive windows of at most window_size characters, as a list of [start char index,end char index]
+#a window only ends in the middle of a word when that word alone is longer than window_size
+def split_windows(text,window_size=5000):
+    windows=[]
+    start=0
+    while start<len(text):
+        end=start+window_size
+        if end<len(text):
+            end=window_end(text,start,end) or end
+        else:
+            end=len(text)
+        windows.append([start,end])
+        start=end
+    return windows
+
+
+#names found by the packages in a group of windows of text, with their ranges moved to the offsets of the whole text
+#returns [{package: ranges}, time per package, [stages, counts] recorded by the profiler]
+def window_names(text,windows,package):
+    timings={}
+    profiler=Profiler()
+    detected={i:[] for i in package}
+    for i,v in detect_names([text[s:e] for s,e in windows],package,timings,profiler).items():
+        for (start,_),spans in zip(windows,v):
+            detected[i].extend([s+start,e+start] for s,e in spans)
+    return [detected,timings,[profiler.stages,profiler.counts]]
+
+
+#names found by each selected package in text, as {package: ranges}, found window by window
+#windows_per_call windows are given to the packages at a time (so they can still batch) and the groups of windows
+#are spread over workers processes when workers is more than 1
+def windowed_names(text,package,window_size=5000,windows_per_call=32,workers=1,timings=None,profiler=None):
+    windows=split_windows(text,window_size)
+    groups=[windows[i:i+windows_per_call] for i in range(0,len(windows),windows_per_call)]
+    if workers>1:
+        #load the models before the workers are forked so that they share them
+        load_models(package)
+    #only the offsets of the windows are sent to the workers, the forked workers already share text with the parent
+    outputs=parallel_map(partial(window_names,text),[[i,package] for i in groups],workers)
+    detected={i:[] for i in package}
+    for group_detected,group_timings,group_stages in outputs:
+        for i in group_detected:
+            detected[i].extend(group_detected[i])
+        if timings!=None:
+            for i in group_timings:
+                timings[i]=timings.get(i,0)+group_timings[i]
+        if profiler!=None:
+            profiler.merge(*group_stages)
+    return detected